@@ -6,17 +6,41 @@ Flask-based interface for multiple sequence alignment
 
 import os
 import re
-import uuid
+import mmap
+import secrets
+import hashlib
+import shlex
+import shutil
 import subprocess
 import tempfile
 import requests
+import threading
 import time
-from flask import Flask, render_template, request, jsonify, send_file, abort
+import diskcache
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, render_template, request, jsonify, send_from_directory, abort
+from flask.json.provider import JSONProvider
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from werkzeug.utils import secure_filename
 
 
 
+class OrjsonProvider(JSONProvider):
+    """Encode responses with orjson; the /align payload carries the
+    alignment preview, where the C encoder is several times faster than
+    the stdlib json module."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload
 app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(__file__), 'uploads')
 app.config['RESULTS_FOLDER'] = os.path.join(os.path.dirname(__file__), 'results')
@@ -25,9 +49,63 @@ app.config['RESULTS_FOLDER'] = os.path.join(os.path.dirname(__file__), 'results'
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['RESULTS_FOLDER'], exist_ok=True)
 
+# Hard cap on FASTA input size; uploads are already bounded by
+# MAX_CONTENT_LENGTH, this also covers text input and fetched sequences.
+MAX_INPUT_BYTES = app.config['MAX_CONTENT_LENGTH']
+
 # Path to clustal-omega executable (adjust for server)
 CLUSTALO_PATH = os.environ.get('CLUSTALO_PATH', 'clustalo')
 
+# Max parallel UniProt/RCSB fetches (keep modest to be polite to the APIs)
+FETCH_CONCURRENCY = int(os.environ.get('FETCH_CONCURRENCY', 4))
+
+# How much of the alignment output is inlined in the /align JSON response;
+# anything larger is fetched through /download instead.
+RESULT_PREVIEW_BYTES = 64 * 1024
+
+# Alignment jobs run on a shared pool so WSGI workers are not tied up
+# waiting on clustalo (itself a separate process); clients get a job id
+# back from /align and poll /job/<job_id>.
+ALIGN_WORKERS = int(os.environ.get('ALIGN_WORKERS', os.cpu_count() or 1))
+ALIGN_EXECUTOR = ThreadPoolExecutor(max_workers=ALIGN_WORKERS)
+JOBS = {}
+JOBS_LOCK = threading.Lock()
+
+# Threads per clustalo run; divide the cores among concurrent jobs so
+# ALIGN_WORKERS parallel alignments do not oversubscribe the host.
+CLUSTALO_THREADS = int(os.environ.get('CLUSTALO_THREADS',
+                                      max(1, (os.cpu_count() or 1) // ALIGN_WORKERS)))
+
+# Byte-identical (fasta, params) resubmissions reuse the previous result
+# file instead of re-running clustalo; cache_* files live alongside the
+# results and are evicted least-recently-used past this cap.
+RESULT_CACHE_MAX_BYTES = int(os.environ.get('RESULT_CACHE_MAX_BYTES', 1 << 30))
+
+# Shared HTTP session: keep-alive pooling avoids a fresh TCP+TLS handshake
+# per fetch, and retries absorb transient 5xx from UniProt/RCSB.
+SESSION = requests.Session()
+SESSION.headers['Accept-Encoding'] = 'gzip'
+_adapter = HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=16,
+    max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504]),
+)
+SESSION.mount('https://', _adapter)
+
+# Separate connect/read timeouts for remote FASTA fetches
+FETCH_TIMEOUT = (3.05, 12)
+
+# UniProt batch endpoint: one request resolves up to 100 accessions
+UNIPROT_BATCH_URL = 'https://rest.uniprot.org/uniprotkb/accessions'
+UNIPROT_BATCH_SIZE = 100
+
+# Disk-backed cache for fetched FASTA records. Accessions are effectively
+# immutable, so repeat submissions (users tweaking seq_type/out_format)
+# skip the network entirely.
+CACHE_DIR = os.environ.get('CACHE_DIR', os.path.join(os.path.dirname(__file__), '.fasta_cache'))
+FASTA_CACHE = diskcache.Cache(CACHE_DIR)
+FASTA_CACHE_TTL = 7 * 24 * 3600  # 7 days
+
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {'fasta', 'fa', 'fas', 'txt', 'seq'}
 
@@ -59,13 +137,50 @@ SEQUENCE_TYPES = {
     'rna':     'RNA',
 }
 
-# Valid residue characters per sequence type (IUPAC, case-insensitive)
-SEQ_TYPE_CHARS = {
-    'protein': re.compile(r'[^ACDEFGHIKLMNPQRSTVWYXBZUJacdefghiklmnpqrstvwyxbzuj*\-]'),
-    'dna':     re.compile(r'[^ACGTURYSWKMBDHVNacgturyswkmbdhvn\-]'),
-    'rna':     re.compile(r'[^ACGURYSWKMBDHVNacguryswkmbdhvn\-]'),
+# Valid residue bytes per sequence type (IUPAC, case-insensitive).
+# Used as bytes.translate delete tables: seq.translate(None, valid) leaves
+# only the invalid characters behind, in a single C-level pass.
+SEQ_TYPE_VALID_BYTES = {
+    'protein': b'ACDEFGHIKLMNPQRSTVWYXBZUJacdefghiklmnpqrstvwyxbzuj*-',
+    'dna':     b'ACGTURYSWKMBDHVNacgturyswkmbdhvn-',
+    'rna':     b'ACGURYSWKMBDHVNacguryswkmbdhvn-',
 }
 
+# Whitespace bytes, stripped from sequence data the same way
+WHITESPACE_BYTES = bytes(b for b in range(256) if chr(b).isspace())
+
+# Compiled once at import; these are hit on every request
+# ID detection: UniProt accessions (e.g. P12345, Q9Y6K9, A0A000AAA0), PDB
+# entry IDs (e.g. 1ABC), and a looser 6-10 alphanumeric UniProt fallback,
+# all in one alternation so detect_input_type can classify every token in
+# a single finditer sweep. The lookarounds pin matches to whole
+# whitespace-separated tokens.
+CLASSIFY_RE = re.compile(
+    r'(?<!\S)(?:'
+    r'(?P<up>[OPQ][0-9][A-Z0-9]{3}[0-9]|[A-NR-Z][0-9](?:[A-Z][A-Z0-9]{2}[0-9]){1,2})'
+    r'|(?P<pdb>[0-9][A-Z0-9]{3})'
+    r'|(?P<broad>[A-Z0-9]{6,10})'
+    r')(?!\S)',
+    re.IGNORECASE,
+)
+# Separators accepted between IDs in text input
+ID_SPLIT_RE = re.compile(r'[\s,;]+')
+# Shell metacharacters never allowed in extra clustalo options
+UNSAFE_OPTS_RE = re.compile(r'[;&|`$<>]')
+
+HEX_DIGITS = frozenset('0123456789abcdef')
+
+
+def is_result_filename(filename):
+    """True for downloadable result names, e.g. result_29b0d324.aln."""
+    name, _, ext = filename.partition('.')
+    return (
+        len(name) == 15
+        and name.startswith('result_')
+        and all(c in HEX_DIGITS for c in name[7:])
+        and ext.isalnum()
+    )
+
 SEQ_TYPE_LABELS = {
     'protein': 'Protein',
     'dna':     'DNA',
@@ -94,70 +209,83 @@ def detect_input_type(text):
     if not tokens:
         return None, "No identifiable input found."
 
-    # UniProt pattern: 6-10 alphanumeric chars (e.g., P12345, Q9Y6K9, A0A000AAA0)
-    uniprot_pattern = re.compile(r'^[OPQ][0-9][A-Z0-9]{3}[0-9]$|^[A-NR-Z][0-9]([A-Z][A-Z0-9]{2}[0-9]){1,2}$', re.IGNORECASE)
-    # PDB pattern: 4-char alphanumeric (e.g., 1ABC, 2XYZ)
-    pdb_pattern = re.compile(r'^[0-9][A-Z0-9]{3}$', re.IGNORECASE)
+    # Classify all tokens in one regex sweep instead of three per-token loops
+    counts = {'up': 0, 'pdb': 0, 'broad': 0}
+    for m in CLASSIFY_RE.finditer(' '.join(tokens)):
+        counts[m.lastgroup] += 1
 
-    uniprot_matches = sum(1 for t in tokens if uniprot_pattern.match(t))
-    pdb_matches = sum(1 for t in tokens if pdb_pattern.match(t))
+    uniprot_matches = counts['up']
+    pdb_matches = counts['pdb']
 
     if uniprot_matches > 0 and uniprot_matches >= pdb_matches:
         return 'uniprot', None
     elif pdb_matches > 0:
         return 'pdb', None
     else:
-        # Could still be UniProt IDs with unusual format - try broader check
-        # UniProt IDs are 6-10 chars
-        broad_uniprot = sum(1 for t in tokens if re.match(r'^[A-Z0-9]{6,10}$', t, re.IGNORECASE))
-        if broad_uniprot == len(tokens):
+        # Could still be UniProt IDs with unusual format - broader 6-10
+        # alphanumeric shape ('broad' group) must cover every token
+        if counts['broad'] == len(tokens):
             return 'uniprot', None
         return None, f"Unrecognized input format. Could not identify as FASTA, UniProt IDs, or PDB IDs. Got: {tokens[:3]}"
 
 
-def validate_fasta(fasta_text, seq_type='protein'):
-    """Validate FASTA format for the given sequence type and return (sequences_dict, error)."""
+def _validate_fasta_buffer(buf, seq_type):
+    """Validator core shared by validate_fasta and validate_fasta_file.
+
+    `buf` is any bytes-like object (bytes or an mmap); records are located
+    with find() so only one record at a time is copied out of the buffer.
+    """
     sequences = {}
-    current_id = None
-    current_seq = []
 
-    bad_char_re = SEQ_TYPE_CHARS.get(seq_type, SEQ_TYPE_CHARS['protein'])
+    valid_bytes = SEQ_TYPE_VALID_BYTES.get(seq_type, SEQ_TYPE_VALID_BYTES['protein'])
     type_label  = SEQ_TYPE_LABELS.get(seq_type, 'Protein')
 
-    for line in fasta_text.splitlines():
-        line = line.strip()
-        if not line:
-            continue
-        if line.startswith('>'):
-            if current_id:
-                seq = ''.join(current_seq)
-                if not seq:
-                    return None, f"Sequence '{current_id}' has no residues."
-                sequences[current_id] = seq
-            current_id = line[1:].strip()
-            if not current_id:
-                return None, "Found a '>' header with no sequence ID."
-            current_seq = []
-        else:
-            if current_id is None:
-                return None, "Sequence data found before any FASTA header ('>...')."
-            cleaned = re.sub(r'\s', '', line)
-            invalid = bad_char_re.sub('', cleaned)   # characters NOT in the valid set
-            # Re-find what was removed vs original
-            found_invalid = bad_char_re.findall(cleaned)
-            if found_invalid:
-                bad_sample = ''.join(dict.fromkeys(found_invalid))[:10]
-                return None, (
-                    f"Invalid {type_label} characters in sequence '{current_id}': "
-                    f"'{bad_sample}'. Check that the correct sequence type is selected."
-                )
-            current_seq.append(cleaned)
+    size = len(buf)
+    if size > MAX_INPUT_BYTES:
+        return None, (
+            f"Input too large ({size // (1024 * 1024)} MB); "
+            f"the limit is {MAX_INPUT_BYTES // (1024 * 1024)} MB."
+        )
 
-    if current_id:
-        seq = ''.join(current_seq)
+    pos = 0
+    while pos < size and buf[pos] in WHITESPACE_BYTES:
+        pos += 1
+
+    if pos < size and buf[pos] != ord('>'):
+        return None, "Sequence data found before any FASTA header ('>...')."
+
+    # Preflight: bail out before any per-residue work if there are not even
+    # two '>' headers. find() is a C-level scan; stop as soon as two exist.
+    n_headers = 0
+    idx = buf.find(b'>', pos)
+    while idx != -1 and n_headers < 2:
+        n_headers += 1
+        idx = buf.find(b'>', idx + 1)
+    if n_headers < 2:
+        return None, f"At least 2 sequences are required for alignment. Found: {n_headers}."
+
+    while pos < size:
+        nxt = buf.find(b'\n>', pos + 1)
+        end = size if nxt == -1 else nxt
+        record = buf[pos + 1:end]  # drop the leading '>'
+        pos = end + 1
+        header, _, body = record.partition(b'\n')
+        current_id = header.strip().decode('utf-8', errors='replace')
+        if not current_id:
+            return None, "Found a '>' header with no sequence ID."
+        # All per-residue work is done with bytes.translate, which runs
+        # in C in a single pass per record.
+        seq = body.translate(None, WHITESPACE_BYTES)
         if not seq:
             return None, f"Sequence '{current_id}' has no residues."
-        sequences[current_id] = seq
+        bad = seq.translate(None, valid_bytes)
+        if bad:
+            bad_sample = ''.join(dict.fromkeys(bad.decode('utf-8', errors='replace')))[:10]
+            return None, (
+                f"Invalid {type_label} characters in sequence '{current_id}': "
+                f"'{bad_sample}'. Check that the correct sequence type is selected."
+            )
+        sequences[current_id] = seq.decode('ascii')
 
     if len(sequences) < 2:
         return None, f"At least 2 sequences are required for alignment. Found: {len(sequences)}."
@@ -165,13 +293,57 @@ def validate_fasta(fasta_text, seq_type='protein'):
     return sequences, None
 
 
+def validate_fasta(fasta_text, seq_type='protein'):
+    """Validate FASTA format for the given sequence type and return (sequences_dict, error)."""
+    return _validate_fasta_buffer(fasta_text.encode('utf-8', errors='replace'), seq_type)
+
+
+def validate_fasta_file(path, seq_type='protein'):
+    """Validate an on-disk FASTA file via mmap, without loading it into a str."""
+    with open(path, 'rb') as fh:
+        if os.fstat(fh.fileno()).st_size == 0:
+            return _validate_fasta_buffer(b'', seq_type)
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _validate_fasta_buffer(mm, seq_type)
+
+
+def summarize_fasta(fasta_text):
+    """Return ({id: sequence_length}, error) for already-trusted FASTA.
+
+    Used for UniProt/PDB-fetched content, which is known to be well-formed:
+    only the header IDs and lengths are needed for stats, so this skips the
+    per-residue validation pass entirely.
+    """
+    seq_lengths = {}
+    current_id = None
+    for line in fasta_text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('>'):
+            current_id = line[1:].strip()
+            seq_lengths[current_id] = 0
+        elif current_id is not None:
+            seq_lengths[current_id] += len(line)
+
+    if len(seq_lengths) < 2:
+        return None, f"At least 2 sequences are required for alignment. Found: {len(seq_lengths)}."
+
+    return seq_lengths, None
+
+
 def fetch_uniprot(uid):
-    """Fetch FASTA sequence from UniProt."""
+    """Fetch FASTA sequence from UniProt (disk-cached)."""
     uid = uid.strip().upper()
+    key = f"uniprot:{uid}"
+    cached = FASTA_CACHE.get(key)
+    if cached is not None:
+        return cached, None
     url = f"https://www.uniprot.org/uniprot/{uid}.fasta"
     try:
-        resp = requests.get(url, timeout=15)
+        resp = SESSION.get(url, timeout=FETCH_TIMEOUT)
         if resp.status_code == 200 and resp.text.startswith('>'):
+            FASTA_CACHE.set(key, resp.text, expire=FASTA_CACHE_TTL)
             return resp.text, None
         elif resp.status_code == 404:
             return None, f"UniProt ID '{uid}' not found."
@@ -184,12 +356,17 @@ def fetch_uniprot(uid):
 
 
 def fetch_pdb(pid):
-    """Fetch FASTA sequence from RCSB PDB."""
+    """Fetch FASTA sequence from RCSB PDB (disk-cached)."""
     pid = pid.strip().upper()
+    key = f"pdb:{pid}"
+    cached = FASTA_CACHE.get(key)
+    if cached is not None:
+        return cached, None
     url = f"https://www.rcsb.org/fasta/entry/{pid}"
     try:
-        resp = requests.get(url, timeout=15)
+        resp = SESSION.get(url, timeout=FETCH_TIMEOUT)
         if resp.status_code == 200 and resp.text.strip().startswith('>'):
+            FASTA_CACHE.set(key, resp.text, expire=FASTA_CACHE_TTL)
             return resp.text, None
         elif resp.status_code == 404:
             return None, f"PDB ID '{pid}' not found."
@@ -201,25 +378,89 @@ def fetch_pdb(pid):
         return None, f"Error fetching PDB ID '{pid}': {str(e)}"
 
 
+def _fetch_uniprot_batch(ids):
+    """Fetch accessions from the UniProt batch endpoint in chunks of 100.
+
+    Returns {accession: fasta_record}. IDs absent from the response
+    (unknown accessions, failed chunks) are simply missing from the dict;
+    the caller retries them per-ID.
+    """
+    records = {}
+    for start in range(0, len(ids), UNIPROT_BATCH_SIZE):
+        chunk = ids[start:start + UNIPROT_BATCH_SIZE]
+        try:
+            resp = SESSION.get(
+                UNIPROT_BATCH_URL,
+                params={'accessions': ','.join(chunk), 'format': 'fasta'},
+                timeout=FETCH_TIMEOUT,
+            )
+        except Exception:
+            continue
+        if resp.status_code != 200 or not resp.text.startswith('>'):
+            continue
+        for record in resp.text.strip().split('\n>'):
+            if not record.startswith('>'):
+                record = '>' + record
+            # Headers look like '>sp|P12345|NAME ...'; the accession is field 2
+            header_parts = record.split('\n', 1)[0].split('|')
+            if len(header_parts) >= 2:
+                records[header_parts[1].upper()] = record
+    return records
+
+
+def _fetch_uniprot_many(ids):
+    """Resolve UniProt IDs to (fasta, error) tuples, in input order.
+
+    Cache hits are served locally, the rest go through the batch endpoint
+    (one round-trip per 100 IDs), and anything the batch response does not
+    cover falls back to per-ID fetches.
+    """
+    ids = [uid.upper() for uid in ids]
+    results = {}
+    missing = []
+    for uid in ids:
+        cached = FASTA_CACHE.get(f"uniprot:{uid}")
+        if cached is not None:
+            results[uid] = (cached, None)
+        elif uid not in missing:
+            missing.append(uid)
+
+    if missing:
+        for uid, record in _fetch_uniprot_batch(missing).items():
+            FASTA_CACHE.set(f"uniprot:{uid}", record, expire=FASTA_CACHE_TTL)
+            results[uid] = (record, None)
+        leftovers = [uid for uid in missing if uid not in results]
+        if leftovers:
+            with ThreadPoolExecutor(max_workers=min(len(leftovers), FETCH_CONCURRENCY)) as executor:
+                for uid, res in zip(leftovers, executor.map(fetch_uniprot, leftovers)):
+                    results[uid] = res
+
+    return [results[uid] for uid in ids]
+
+
 def fetch_sequences_from_ids(ids, id_type):
     """Fetch multiple sequences from UniProt or PDB IDs."""
-    combined_fasta = ""
+    parts = []
     errors = []
     fetched = 0
 
-    for uid in ids:
-        uid = uid.strip()
-        if not uid:
-            continue
-        if id_type == 'uniprot':
-            fasta, err = fetch_uniprot(uid)
-        else:
-            fasta, err = fetch_pdb(uid)
+    ids = [uid.strip() for uid in ids if uid.strip()]
+    if not ids:
+        return None, "No IDs provided."
+
+    if id_type == 'uniprot':
+        results = _fetch_uniprot_many(ids)
+    else:
+        # No batch endpoint for PDB; fetches are independent network I/O,
+        # so run them concurrently.
+        with ThreadPoolExecutor(max_workers=min(len(ids), FETCH_CONCURRENCY)) as executor:
+            results = list(executor.map(fetch_pdb, ids))
 
+    for fasta, err in results:
         if err:
             errors.append(err)
         else:
-            combined_fasta += fasta.strip() + "\n"
+            parts.append(fasta.strip())
             fetched += 1
 
     if errors and fetched == 0:
@@ -230,38 +471,109 @@ def fetch_sequences_from_ids(ids, id_type):
             msg += "\nErrors:\n" + "\n".join(errors)
         return None, msg
 
+    combined_fasta = "\n".join(parts) + "\n"
     warnings = errors  # partial failures become warnings
     return combined_fasta, warnings if warnings else None
 
 
 # ─── ClustalOmega Runner ──────────────────────────────────────────────────────
 
+# check_clustalo TTL cache: / and /status would otherwise fork
+# clustalo --version on every page load and poll.
+_CLUSTALO_CHECK = {'t': 0.0, 'val': None}
+_CLUSTALO_CHECK_TTL = 60       # seconds to trust a successful probe
+_CLUSTALO_CHECK_FAIL_TTL = 5   # re-probe failures quickly so recovery is fast
+
+
 def check_clustalo():
-    """Check if clustalo is available."""
+    """Check if clustalo is available (cached with a short TTL)."""
+    cached = _CLUSTALO_CHECK['val']
+    if cached is not None:
+        ttl = _CLUSTALO_CHECK_TTL if cached[0] else _CLUSTALO_CHECK_FAIL_TTL
+        if time.time() - _CLUSTALO_CHECK['t'] < ttl:
+            return cached
+
     try:
         result = subprocess.run(
             [CLUSTALO_PATH, '--version'],
             capture_output=True, text=True, timeout=10
         )
-        return result.returncode == 0, result.stdout.strip()
+        val = (result.returncode == 0, result.stdout.strip())
     except FileNotFoundError:
-        return False, None
+        val = (False, None)
     except Exception:
-        return False, None
+        val = (False, None)
+
+    _CLUSTALO_CHECK['t'] = time.time()
+    _CLUSTALO_CHECK['val'] = val
+    return val
+
+
+def _evict_result_cache():
+    """Drop least-recently-used cache_* files once the cache exceeds its cap."""
+    folder = app.config['RESULTS_FOLDER']
+    entries = []
+    for name in os.listdir(folder):
+        if not name.startswith('cache_'):
+            continue
+        path = os.path.join(folder, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        entries.append((st.st_atime, st.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    entries.sort()
+    for _, size, path in entries:
+        if total <= RESULT_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
 
 
-def run_clustalo(fasta_text, out_format='clustal', seq_type='protein', extra_opts='', iterations=0):
+def run_clustalo(fasta_text, out_format='clustal', seq_type='protein', extra_opts='', iterations=0,
+                 input_path=None, job_id=None, preview_bytes=RESULT_PREVIEW_BYTES):
     """
     Run Clustal-Omega and return (result_text, result_path, error).
+
+    Only the first `preview_bytes` of the output are read back into Python;
+    the full alignment stays on disk and is served through /download.
+
+    If `input_path` is given the FASTA is already on disk (streamed upload);
+    otherwise `fasta_text` is piped to clustalo on stdin, avoiding a temp
+    file write+unlink per alignment.
     """
-    job_id = str(uuid.uuid4())[:8]
-    input_path = os.path.join(app.config['UPLOAD_FOLDER'], f"input_{job_id}.fasta")
+    if job_id is None:
+        job_id = secrets.token_hex(4)
     ext = FORMAT_EXTENSIONS.get(out_format, 'aln')
     output_path = os.path.join(app.config['RESULTS_FOLDER'], f"result_{job_id}.{ext}")
 
-    # Write input
-    with open(input_path, 'w') as f:
-        f.write(fasta_text)
+    # Content-addressed cache: identical (fasta, params) reuse the stored
+    # result file and skip the clustalo run entirely.
+    h = hashlib.blake2b(digest_size=16)
+    if input_path is not None:
+        with open(input_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+    else:
+        h.update(fasta_text.encode())
+    h.update(f"|{out_format}|{seq_type}|{extra_opts}|{iterations}".encode())
+    cache_path = os.path.join(app.config['RESULTS_FOLDER'], f"cache_{h.hexdigest()}.{ext}")
+
+    if os.path.exists(cache_path):
+        shutil.copyfile(cache_path, output_path)
+        os.utime(cache_path)  # refresh recency for LRU eviction
+        if input_path is not None:
+            try:
+                os.remove(input_path)
+            except Exception:
+                pass
+        with open(output_path, 'r') as f:
+            return f.read(preview_bytes), output_path, None
 
     # Map internal key to clustalo --seqtype value
     seqtype_arg = SEQUENCE_TYPES.get(seq_type, 'Protein')
@@ -269,10 +581,11 @@ def run_clustalo(fasta_text, out_format='clustal', seq_type='protein', extra_opt
     # Build command
     cmd = [
         CLUSTALO_PATH,
-        '-i', input_path,
+        '-i', input_path if input_path is not None else '-',
         '-o', output_path,
         '--outfmt', out_format,
         '--seqtype', seqtype_arg,
+        '--threads', str(CLUSTALO_THREADS),
         '--force',
     ]
 
@@ -284,9 +597,8 @@ def run_clustalo(fasta_text, out_format='clustal', seq_type='protein', extra_opt
         # Split carefully; prevent injection
         safe_opts = extra_opts.strip()
         # Only allow safe characters
-        if re.search(r'[;&|`$<>]', safe_opts):
+        if UNSAFE_OPTS_RE.search(safe_opts):
             return None, None, "Extra options contain unsafe characters."
-        import shlex
         try:
             parsed = shlex.split(safe_opts)
             cmd += parsed
@@ -296,16 +608,18 @@ def run_clustalo(fasta_text, out_format='clustal', seq_type='protein', extra_opt
     try:
         result = subprocess.run(
             cmd,
+            input=fasta_text if input_path is None else None,
             capture_output=True,
             text=True,
             timeout=120
         )
 
-        # Clean up input file
-        try:
-            os.remove(input_path)
-        except Exception:
-            pass
+        # Clean up input file (only uploads touch disk now)
+        if input_path is not None:
+            try:
+                os.remove(input_path)
+            except Exception:
+                pass
 
         if result.returncode != 0:
             err_msg = result.stderr.strip() or result.stdout.strip()
@@ -314,8 +628,15 @@ def run_clustalo(fasta_text, out_format='clustal', seq_type='protein', extra_opt
         if not os.path.exists(output_path):
             return None, None, "ClustalOmega ran but produced no output file."
 
+        # Populate the result cache for identical resubmissions
+        try:
+            shutil.copyfile(output_path, cache_path)
+            _evict_result_cache()
+        except Exception:
+            pass
+
         with open(output_path, 'r') as f:
-            output_text = f.read()
+            output_text = f.read(preview_bytes)
 
         return output_text, output_path, None
 
@@ -327,6 +648,45 @@ def run_clustalo(fasta_text, out_format='clustal', seq_type='protein', extra_opt
         return None, None, f"Unexpected error running ClustalOmega: {str(e)}"
 
 
+def _execute_alignment(fasta_text, out_format, seq_type, extra_opts, iterations,
+                       input_path, job_id, seq_lengths, warnings, input_type):
+    """Run clustalo and assemble the /align response payload.
+
+    Runs on ALIGN_EXECUTOR for async jobs, or inline when /align?sync=1.
+    Returns (payload_dict, http_status).
+    """
+    result_text, result_path, run_error = run_clustalo(
+        fasta_text, out_format, seq_type, extra_opts, iterations,
+        input_path=input_path, job_id=job_id
+    )
+
+    if run_error:
+        return {'success': False, 'error': run_error}, 500
+
+    lengths = list(seq_lengths.values())
+    stats = {
+        'sequences': len(seq_lengths),
+        'min_length': min(lengths),
+        'max_length': max(lengths),
+        'avg_length': round(sum(lengths) / len(lengths)),
+        'format': OUTPUT_FORMATS.get(out_format, out_format),
+        'seq_type': SEQ_TYPE_LABELS.get(seq_type, seq_type.capitalize()),
+        'result_file': os.path.basename(result_path),
+    }
+
+    return {
+        'success': True,
+        'result': result_text,
+        'truncated': os.path.getsize(result_path) > RESULT_PREVIEW_BYTES,
+        'stats': stats,
+        'warnings': warnings,
+        'input_type': input_type,
+        'out_format': out_format,
+        'seq_type': seq_type,
+        'result_file': os.path.basename(result_path),
+    }, 200
+
+
 # ─── Routes ───────────────────────────────────────────────────────────────────
 
 @app.route('/')
@@ -359,6 +719,8 @@ def align():
         return jsonify({'success': False, 'error': f"Unknown sequence type: '{seq_type}'. Choose protein, dna, or rna."}), 400
 
     fasta_text = None
+    input_path = None
+    job_id = None
 
     if input_mode == 'file':
         # File upload
@@ -370,8 +732,12 @@ def align():
         ext = f.filename.rsplit('.', 1)[-1].lower() if '.' in f.filename else ''
         if ext not in ALLOWED_EXTENSIONS:
             return jsonify({'success': False, 'error': f"File type '.{ext}' not allowed. Use FASTA format (.fasta, .fa, .fas, .txt)."}), 400
+        # Stream the upload straight to the clustalo input path instead of
+        # decoding the whole file into a Python str.
+        job_id = secrets.token_hex(4)
+        input_path = os.path.join(app.config['UPLOAD_FOLDER'], f"input_{job_id}.fasta")
         try:
-            fasta_text = f.read().decode('utf-8', errors='replace')
+            f.save(input_path)
         except Exception as e:
             return jsonify({'success': False, 'error': f"Could not read uploaded file: {e}"}), 400
 
@@ -397,7 +763,7 @@ def align():
                 seq_type = 'protein'
 
             # Extract IDs
-            ids = re.split(r'[\s,;]+', raw_text)
+            ids = ID_SPLIT_RE.split(raw_text)
             ids = [i.strip() for i in ids if i.strip()]
             if len(ids) < 2:
                 return jsonify({'success': False, 'error': f"Need at least 2 {input_type.upper()} IDs. Got {len(ids)}."}), 400
@@ -413,54 +779,77 @@ def align():
             fasta_text = raw_text
 
     # ── Validate FASTA ──
-    sequences, val_error = validate_fasta(fasta_text, seq_type)
+    if input_type in ('uniprot', 'pdb'):
+        # Fetched content is already verified FASTA; just gather stats.
+        seq_lengths, val_error = summarize_fasta(fasta_text)
+    elif input_path is not None:
+        sequences, val_error = validate_fasta_file(input_path, seq_type)
+    else:
+        sequences, val_error = validate_fasta(fasta_text, seq_type)
     if val_error:
+        if input_path is not None:
+            try:
+                os.remove(input_path)
+            except Exception:
+                pass
         return jsonify({'success': False, 'error': f"Sequence validation error: {val_error}"}), 400
 
-    seq_count = len(sequences)
+    if input_type not in ('uniprot', 'pdb'):
+        seq_lengths = {sid: len(seq) for sid, seq in sequences.items()}
 
-    # ── Run ClustalOmega ──
-    result_text, result_path, run_error = run_clustalo(
-        fasta_text, out_format, seq_type, extra_opts, iterations
-    )
-
-    if run_error:
-        return jsonify({'success': False, 'error': run_error}), 500
+    if job_id is None:
+        job_id = secrets.token_hex(4)
 
-    # ── Build stats ──
-    lengths = [len(v) for v in sequences.values()]
-    stats = {
-        'sequences': seq_count,
-        'min_length': min(lengths),
-        'max_length': max(lengths),
-        'avg_length': round(sum(lengths) / len(lengths)),
-        'format': OUTPUT_FORMATS.get(out_format, out_format),
-        'seq_type': SEQ_TYPE_LABELS.get(seq_type, seq_type.capitalize()),
-        'result_file': os.path.basename(result_path),
-    }
+    # ── Run ClustalOmega ──
+    if request.args.get('sync') == '1':
+        payload, code = _execute_alignment(
+            fasta_text, out_format, seq_type, extra_opts, iterations,
+            input_path, job_id, seq_lengths, warnings, input_type
+        )
+        return jsonify(payload), code
 
-    return jsonify({
-        'success': True,
-        'result': result_text,
-        'stats': stats,
-        'warnings': warnings,
-        'input_type': input_type,
-        'out_format': out_format,
-        'seq_type': seq_type,
-        'result_file': os.path.basename(result_path),
-    })
+    # Default: dispatch to the alignment pool and let the client poll
+    future = ALIGN_EXECUTOR.submit(
+        _execute_alignment,
+        fasta_text, out_format, seq_type, extra_opts, iterations,
+        input_path, job_id, seq_lengths, warnings, input_type
+    )
+    with JOBS_LOCK:
+        JOBS[job_id] = future
+    return jsonify({'success': True, 'job_id': job_id}), 202
+
+
+@app.route('/job/<job_id>')
+def job_status(job_id):
+    """Poll a running alignment job; returns the /align payload when done."""
+    with JOBS_LOCK:
+        future = JOBS.get(job_id)
+    if future is None:
+        return jsonify({'status': 'unknown', 'success': False, 'error': 'No such job.'}), 404
+    if not future.done():
+        return jsonify({'status': 'running'}), 200
+
+    with JOBS_LOCK:
+        JOBS.pop(job_id, None)
+    try:
+        payload, code = future.result()
+    except Exception as e:
+        return jsonify({'status': 'error', 'success': False, 'error': str(e)}), 500
+    payload['status'] = 'done'
+    return jsonify(payload), code
 
 
 @app.route('/download/<filename>')
 def download(filename):
     """Download a result file."""
     # Security: only allow safe filenames from our results folder
-    if not re.match(r'^result_[a-f0-9]{8}\.\w+$', filename):
+    if not is_result_filename(filename):
         abort(403)
-    filepath = os.path.join(app.config['RESULTS_FOLDER'], filename)
-    if not os.path.exists(filepath):
-        abort(404)
-    return send_file(filepath, as_attachment=True, download_name=filename)
+    # send_from_directory 404s on missing files itself (no extra stat) and
+    # lets the WSGI server use sendfile/file-wrapper offload.
+    return send_from_directory(app.config['RESULTS_FOLDER'], filename,
+                               as_attachment=True, download_name=filename,
+                               conditional=True)
 
 
 @app.route('/status')
@@ -478,6 +867,7 @@ PREFIX = '/u316755/clustal'
 
 # This must be the part uWSGI loads
 hostedApp = Flask(__name__)
+hostedApp.json = OrjsonProvider(hostedApp)
 hostedApp.wsgi_app = DispatcherMiddleware(NotFound(), {
     PREFIX: app  # 'app' is your original Flask(name) variable
 })